@@ -0,0 +1,230 @@
+"""
+Sensor helpers for submitting partitioned work as a single tracked backfill.
+
+Returning one RunRequest per partition from a sensor makes the QueuedRunCoordinator
+dequeue and launch thousands of tiny runs. build_backfill_run_requests() instead groups
+the changed partitions into contiguous partition ranges of at most `chunk_size` keys and
+emits one RunRequest per range. Every run carries the same `anduin/backfill` run tag.
+
+The sensors in backfill_sensors track each backfill in anduin.backfill_status:
+backfill_status_sensor registers the id once the first tagged run is queued, so sensor
+previews and failed ticks never leave a RUNNING row without runs, and a sensor per terminal
+run status calls anduin.set_backfill_finished() once every tagged run has finished. They
+start RUNNING so no queued run is missed.
+
+This is not a Dagster backfill: the runs do not use Dagster's `dagster/backfill` tag, so
+they show up as regular runs in the Runs view and runs.backfill_id stays NULL.
+
+Assets materialized this way run over a partition range, so they must iterate
+context.partition_keys rather than reading context.partition_key.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import string
+from typing import Optional, Sequence
+
+import dagster as dg
+import psycopg2
+
+BACKFILL_ID_TAG = "anduin/backfill"
+ASSET_PARTITION_RANGE_START_TAG = "dagster/asset_partition_range_start"
+ASSET_PARTITION_RANGE_END_TAG = "dagster/asset_partition_range_end"
+
+DEFAULT_CHUNK_SIZE = 100
+
+BACKFILL_ID_LENGTH = 8
+
+
+def make_backfill_id() -> str:
+    return "".join(random.choice(string.ascii_lowercase) for _ in range(BACKFILL_ID_LENGTH))
+
+
+def connect_dagster_db():
+    """
+    Connect to the Dagster database, where the anduin schema lives.
+    """
+    return psycopg2.connect(
+        host=os.environ.get("DAGSTER_POSTGRES_HOST", "postgres"),
+        port=os.environ.get("DAGSTER_POSTGRES_PORT", "5432"),
+        user=os.environ.get("DAGSTER_POSTGRES_USER", "postgres"),
+        password=os.environ.get("DAGSTER_POSTGRES_PASSWORD", "postgres"),
+        dbname=os.environ.get("DAGSTER_POSTGRES_DB", "dagster"),
+    )
+
+
+def register_backfill(dagster_db_conn, backfill_id: str) -> None:
+    """
+    Insert a RUNNING row for backfill_id into anduin.backfill_status.
+    """
+    try:
+        with dagster_db_conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO anduin.backfill_status (backfill_id) VALUES (%s) "
+                "ON CONFLICT (backfill_id) DO NOTHING",
+                (backfill_id,),
+            )
+        dagster_db_conn.commit()
+    except Exception:
+        dagster_db_conn.rollback()
+        raise
+
+
+def finish_backfill(dagster_db_conn, backfill_id: str) -> bool:
+    """
+    Mark backfill_id FINISHED, registering it first if its queued runs were never seen.
+    """
+    try:
+        with dagster_db_conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO anduin.backfill_status (backfill_id) VALUES (%s) "
+                "ON CONFLICT (backfill_id) DO NOTHING",
+                (backfill_id,),
+            )
+            cursor.execute("SELECT anduin.set_backfill_finished(%s)", (backfill_id,))
+            finished = cursor.fetchone()[0]
+        dagster_db_conn.commit()
+    except Exception:
+        dagster_db_conn.rollback()
+        raise
+    return finished
+
+
+@dg.run_status_sensor(
+    run_status=dg.DagsterRunStatus.QUEUED,
+    default_status=dg.DefaultSensorStatus.RUNNING,
+)
+def backfill_status_sensor(context: dg.RunStatusSensorContext):
+    """
+    Register the backfill of each queued run tagged by build_backfill_run_requests().
+    """
+    backfill_id = context.dagster_run.tags.get(BACKFILL_ID_TAG)
+    if not backfill_id:
+        return
+
+    conn = connect_dagster_db()
+    try:
+        register_backfill(conn, backfill_id)
+    finally:
+        conn.close()
+
+
+TERMINAL_STATUSES = [
+    dg.DagsterRunStatus.SUCCESS,
+    dg.DagsterRunStatus.FAILURE,
+    dg.DagsterRunStatus.CANCELED,
+]
+
+
+def _backfill_finished_sensor(run_status: dg.DagsterRunStatus) -> dg.RunStatusSensorDefinition:
+    @dg.run_status_sensor(
+        name=f"backfill_{run_status.value.lower()}_sensor",
+        run_status=run_status,
+        default_status=dg.DefaultSensorStatus.RUNNING,
+    )
+    def _sensor(context: dg.RunStatusSensorContext):
+        backfill_id = context.dagster_run.tags.get(BACKFILL_ID_TAG)
+        if not backfill_id:
+            return
+
+        runs = context.instance.get_runs(filters=dg.RunsFilter(tags={BACKFILL_ID_TAG: backfill_id}))
+        if any(run.status not in TERMINAL_STATUSES for run in runs):
+            return
+
+        conn = connect_dagster_db()
+        try:
+            if finish_backfill(conn, backfill_id):
+                context.log.info(f"Backfill {backfill_id} finished ({len(runs)} runs)")
+        finally:
+            conn.close()
+
+    return _sensor
+
+
+backfill_sensors = [
+    backfill_status_sensor,
+    *[_backfill_finished_sensor(status) for status in TERMINAL_STATUSES],
+]
+
+
+def chunk_partition_keys(
+    partition_keys: Sequence[str],
+    ordered_keys: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[tuple[str, str]]:
+    """
+    Group partition_keys into (start, end) ranges over ordered_keys.
+
+    A range only covers keys that were requested: a gap in ordered_keys starts a new range,
+    and no range spans more than chunk_size keys.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    requested = set(partition_keys)
+    ranges: list[tuple[str, str]] = []
+    start: Optional[str] = None
+    end: Optional[str] = None
+    size = 0
+
+    for key in ordered_keys:
+        if key not in requested or size == chunk_size:
+            if start is not None:
+                ranges.append((start, end))
+            start, end, size = None, None, 0
+        if key in requested:
+            if start is None:
+                start = key
+            end = key
+            size += 1
+
+    if start is not None:
+        ranges.append((start, end))
+    return ranges
+
+
+def build_backfill_run_requests(
+    context: dg.SensorEvaluationContext,
+    partitions_def: dg.DynamicPartitionsDefinition,
+    partition_keys: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tags: Optional[dict[str, str]] = None,
+) -> tuple[Optional[str], list[dg.RunRequest], list[dg.AddDynamicPartitionsRequest]]:
+    """
+    Build the run requests for one sensor tick as a single backfill.
+
+    Returns (backfill_id, run_requests, dynamic_partitions_requests), ready to be passed to
+    dg.SensorResult. Keys not yet known to the instance are added to partitions_def, in
+    order, so they can be included in the ranges. backfill_id is None if there is nothing
+    to run. Include backfill_sensors in the same Definitions to track completion.
+    """
+    partition_keys = list(dict.fromkeys(partition_keys))
+    if not partition_keys:
+        return None, [], []
+
+    existing = list(context.instance.get_dynamic_partitions(partitions_def.name))
+    existing_set = set(existing)
+    new_keys = [key for key in partition_keys if key not in existing_set]
+
+    dynamic_partitions_requests = []
+    if new_keys:
+        dynamic_partitions_requests.append(partitions_def.build_add_request(new_keys))
+
+    ranges = chunk_partition_keys(partition_keys, existing + new_keys, chunk_size)
+
+    backfill_id = make_backfill_id()
+
+    run_requests = []
+    for i, (start, end) in enumerate(ranges):
+        run_tags = dict(tags or {})
+        run_tags[BACKFILL_ID_TAG] = backfill_id
+        run_tags[ASSET_PARTITION_RANGE_START_TAG] = start
+        run_tags[ASSET_PARTITION_RANGE_END_TAG] = end
+        run_requests.append(dg.RunRequest(run_key=f"{backfill_id}:{i}", tags=run_tags))
+
+    context.log.info(
+        f"Backfill {backfill_id}: {len(partition_keys)} partitions in {len(run_requests)} runs"
+    )
+    return backfill_id, run_requests, dynamic_partitions_requests
@@ -0,0 +1,328 @@
+"""
+Compute log manager that stores stdout/stderr as gzip chunks on a shared volume.
+
+Logs are captured to a local staging dir (as LocalComputeLogManager does) and shipped to
+`base_dir` every `upload_interval` seconds and once more when the step finishes, after
+which the staged copy is deleted. Each upload only appends the bytes written since the
+previous one, as gzip chunks of at most `chunk_bytes` uncompressed bytes. A short trailing
+chunk is rewritten by the next upload rather than followed by another one, so a quiet step
+keeps a single tail chunk instead of one small file per interval. A log is stored as
+
+    <base_dir>/<run_id>/compute_logs/<step_key>.<out|err>.chunks/<start>-<length>.gz
+    <base_dir>/<run_id>/compute_logs/<step_key>.<out|err>.complete
+
+Chunk file names carry their uncompressed offset and length, so the UI's ranged reads
+only decompress the chunks that overlap the requested range. Everything for a run lives
+under <base_dir>/<run_id>, so dagster_cleanup.py can reclaim it by run id.
+
+The webserver's raw log download needs a plain local file, so download_from_cloud_storage()
+reassembles one in the staging dir. These copies are evicted after DOWNLOAD_TTL_SECONDS (on
+the next download) or when the manager is disposed, and reads always prefer the chunk store
+once a log is complete.
+
+Configure in dagster.yaml:
+
+    compute_logs:
+      module: anduin_compute_logs
+      class: CompressedComputeLogManager
+      config:
+        base_dir: /opt/dagster/compute_logs
+        upload_interval: 30
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Mapping, Optional, Sequence
+
+from dagster import Field, StringSource
+from dagster import _check as check
+from dagster._core.storage.cloud_storage_compute_log_manager import (
+    CloudStorageComputeLogManager,
+    PollingComputeLogSubscriptionManager,
+)
+from dagster._core.storage.compute_log_manager import ComputeIOType
+from dagster._core.storage.local_compute_log_manager import (
+    IO_TYPE_EXTENSION,
+    LocalComputeLogManager,
+)
+from dagster._serdes import ConfigurableClass, ConfigurableClassData
+from dagster._utils import ensure_dir, ensure_file
+
+DEFAULT_UPLOAD_INTERVAL = 30
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+DOWNLOAD_TTL_SECONDS = 60 * 60
+
+CHUNK_NAME = re.compile(r"^(\d{16})-(\d+)\.gz$")
+
+
+class CompressedComputeLogManager(CloudStorageComputeLogManager, ConfigurableClass):
+    def __init__(
+        self,
+        base_dir: str,
+        local_dir: Optional[str] = None,
+        upload_interval: int = DEFAULT_UPLOAD_INTERVAL,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        inst_data: Optional[ConfigurableClassData] = None,
+    ):
+        self._base_dir = check.str_param(base_dir, "base_dir")
+        if not local_dir:
+            local_dir = os.path.join(tempfile.gettempdir(), "dagster-compute-logs")
+
+        self._local_dir = local_dir
+        self._local_manager = LocalComputeLogManager(local_dir)
+        self._subscription_manager = PollingComputeLogSubscriptionManager(self)
+        self._upload_interval = check.int_param(upload_interval, "upload_interval")
+        self._chunk_bytes = check.int_param(chunk_bytes, "chunk_bytes")
+        self._compression_level = check.int_param(compression_level, "compression_level")
+        self._inst_data = check.opt_inst_param(inst_data, "inst_data", ConfigurableClassData)
+        # partial uploads run on a watcher thread and may overlap the final upload
+        self._upload_lock = threading.Lock()
+        # local copies written for raw log downloads, path -> time written
+        self._downloads: dict[str, float] = {}
+        self._downloads_lock = threading.Lock()
+        super().__init__()
+
+    @property
+    def inst_data(self):
+        return self._inst_data
+
+    @classmethod
+    def config_type(cls):
+        return {
+            "base_dir": StringSource,
+            "local_dir": Field(StringSource, is_required=False),
+            "upload_interval": Field(int, is_required=False, default_value=DEFAULT_UPLOAD_INTERVAL),
+            "chunk_bytes": Field(int, is_required=False, default_value=DEFAULT_CHUNK_BYTES),
+            "compression_level": Field(
+                int, is_required=False, default_value=DEFAULT_COMPRESSION_LEVEL
+            ),
+        }
+
+    @classmethod
+    def from_config_value(
+        cls, inst_data: ConfigurableClassData, config_value: Mapping[str, Any]
+    ) -> "CompressedComputeLogManager":
+        return cls(inst_data=inst_data, **config_value)
+
+    @property
+    def local_manager(self) -> LocalComputeLogManager:
+        return self._local_manager
+
+    @property
+    def upload_interval(self) -> Optional[int]:
+        return self._upload_interval if self._upload_interval else None
+
+    @property
+    def base_dirs(self) -> Sequence[str]:
+        """Directories holding per-run log dirs, for dagster_cleanup.py --sweep-orphans."""
+        return [self._base_dir, self._local_dir]
+
+    def _remote_path(self, log_key: Sequence[str], suffix: str) -> Path:
+        [*namespace, filebase] = log_key
+        base_dir_path = Path(self._base_dir).resolve()
+        path = base_dir_path.joinpath(*namespace, f"{filebase}.{suffix}").resolve()
+        if base_dir_path not in path.parents:
+            raise ValueError("Invalid path")
+        return path
+
+    def _chunk_dir(self, log_key: Sequence[str], io_type: ComputeIOType) -> Path:
+        return self._remote_path(log_key, f"{IO_TYPE_EXTENSION[io_type]}.chunks")
+
+    def _complete_path(self, log_key: Sequence[str], io_type: ComputeIOType) -> Path:
+        return self._remote_path(log_key, f"{IO_TYPE_EXTENSION[io_type]}.complete")
+
+    def _list_chunks(self, log_key: Sequence[str], io_type: ComputeIOType) -> list[tuple[int, int, str]]:
+        """Return (start, length, path) for every stored chunk, in offset order."""
+        chunk_dir = self._chunk_dir(log_key, io_type)
+        if not chunk_dir.is_dir():
+            return []
+        by_start: dict[int, tuple[int, int, str]] = {}
+        with os.scandir(chunk_dir) as entries:
+            for entry in entries:
+                match = CHUNK_NAME.match(entry.name)
+                if match:
+                    chunk = (int(match.group(1)), int(match.group(2)), entry.path)
+                    # while a tail chunk is being rewritten both copies exist; keep the longer
+                    if chunk[1] > by_start.get(chunk[0], (0, -1, ""))[1]:
+                        by_start[chunk[0]] = chunk
+        return sorted(by_start.values())
+
+    def upload_to_cloud_storage(
+        self, log_key: Sequence[str], io_type: ComputeIOType, partial: bool = False
+    ) -> None:
+        local_path = self.local_manager.get_captured_local_path(log_key, IO_TYPE_EXTENSION[io_type])
+        ensure_file(local_path)
+
+        with self._upload_lock:
+            chunks = self._list_chunks(log_key, io_type)
+            shipped = chunks[-1][0] + chunks[-1][1] if chunks else 0
+
+            chunk_dir = self._chunk_dir(log_key, io_type)
+            ensure_dir(str(chunk_dir))
+            if os.path.getsize(local_path) > shipped:
+                # re-ship a short tail chunk from its start so it grows in place
+                tail = chunks[-1] if chunks and chunks[-1][1] < self._chunk_bytes else None
+                offset = tail[0] if tail else shipped
+                with open(local_path, "rb") as src:
+                    src.seek(offset)
+                    while True:
+                        data = src.read(self._chunk_bytes)
+                        if not data:
+                            break
+                        # write then rename so readers never see a half-written chunk
+                        name = f"{offset:016d}-{len(data)}.gz"
+                        tmp_path = chunk_dir / f".{name}.tmp"
+                        with open(tmp_path, "wb") as dest:
+                            dest.write(gzip.compress(data, compresslevel=self._compression_level))
+                        os.replace(tmp_path, chunk_dir / name)
+                        if tail and tail[0] == offset:
+                            os.remove(tail[2])
+                        offset += len(data)
+
+            if not partial:
+                self._complete_path(log_key, io_type).touch()
+
+    def cloud_storage_has_logs(
+        self, log_key: Sequence[str], io_type: ComputeIOType, partial: bool = False
+    ) -> bool:
+        if partial:
+            return self._chunk_dir(log_key, io_type).is_dir()
+        return self._complete_path(log_key, io_type).exists()
+
+    def get_log_data_for_type(
+        self,
+        log_key: Sequence[str],
+        io_type: ComputeIOType,
+        offset: int,
+        max_bytes: Optional[int],
+    ) -> tuple[Optional[bytes], int]:
+        # a finished log is read from the chunk store, even if a download copy exists locally
+        if not self.cloud_storage_has_logs(log_key, io_type) and self.has_local_file(
+            log_key, io_type
+        ):
+            local_path = self.local_manager.get_captured_local_path(
+                log_key, IO_TYPE_EXTENSION[io_type]
+            )
+            return self.local_manager.read_path(local_path, offset=offset, max_bytes=max_bytes)
+
+        try:
+            return self._read_chunks(log_key, io_type, offset, max_bytes)
+        except FileNotFoundError:
+            # the tail chunk was replaced between listing and reading; list again
+            return self._read_chunks(log_key, io_type, offset, max_bytes)
+
+    def _read_chunks(
+        self,
+        log_key: Sequence[str],
+        io_type: ComputeIOType,
+        offset: int,
+        max_bytes: Optional[int],
+    ) -> tuple[Optional[bytes], int]:
+        chunks = self._list_chunks(log_key, io_type)
+        if not chunks:
+            return None, offset
+
+        end = None if max_bytes is None else offset + max_bytes
+        parts = []
+        for start, length, path in chunks:
+            if start + length <= offset:
+                continue
+            if end is not None and start >= end:
+                break
+            with open(path, "rb") as f:
+                data = gzip.decompress(f.read())
+            lo = max(offset - start, 0)
+            hi = length if end is None else min(end - start, length)
+            parts.append(data[lo:hi])
+
+        data = b"".join(parts)
+        return data, offset + len(data)
+
+    def download_from_cloud_storage(
+        self, log_key: Sequence[str], io_type: ComputeIOType, partial: bool = False
+    ) -> None:
+        """Reassemble the chunks into a local file, for the webserver's raw log download."""
+        path = self.local_manager.get_captured_local_path(
+            log_key, IO_TYPE_EXTENSION[io_type], partial=partial
+        )
+        self._evict_downloads(time.time() - DOWNLOAD_TTL_SECONDS)
+        ensure_dir(os.path.dirname(path))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as dest:
+            for _, _, chunk_path in self._list_chunks(log_key, io_type):
+                with open(chunk_path, "rb") as f:
+                    dest.write(gzip.decompress(f.read()))
+        os.replace(tmp_path, path)
+        with self._downloads_lock:
+            self._downloads[path] = time.time()
+
+    def _evict_downloads(self, written_before: float) -> None:
+        """Remove download copies written before written_before."""
+        with self._downloads_lock:
+            expired = [path for path, written in self._downloads.items() if written < written_before]
+            for path in expired:
+                del self._downloads[path]
+        for path in expired:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def download_url_for_type(self, log_key: Sequence[str], io_type: ComputeIOType):
+        if not self.is_capture_complete(log_key):
+            return None
+        return self.local_manager.get_captured_log_download_url(log_key, io_type)
+
+    def display_path_for_type(self, log_key: Sequence[str], io_type: ComputeIOType):
+        return str(self._chunk_dir(log_key, io_type))
+
+    def delete_logs(
+        self, log_key: Optional[Sequence[str]] = None, prefix: Optional[Sequence[str]] = None
+    ):
+        self.local_manager.delete_logs(log_key=log_key, prefix=prefix)
+
+        if log_key:
+            for io_type in (ComputeIOType.STDOUT, ComputeIOType.STDERR):
+                shutil.rmtree(self._chunk_dir(log_key, io_type), ignore_errors=True)
+                self._complete_path(log_key, io_type).unlink(missing_ok=True)
+        elif prefix:
+            dir_to_delete = os.path.join(self._base_dir, *prefix)
+            if os.path.isdir(dir_to_delete):
+                shutil.rmtree(dir_to_delete)
+        else:
+            check.failed("Must pass in either `log_key` or `prefix` argument to delete_logs")
+
+    def get_log_keys_for_log_key_prefix(
+        self, log_key_prefix: Sequence[str], io_type: ComputeIOType
+    ) -> Sequence[list[str]]:
+        directory = Path(self._base_dir).resolve().joinpath(*log_key_prefix)
+        if not directory.is_dir():
+            return []
+
+        suffix = f".{IO_TYPE_EXTENSION[io_type]}.chunks"
+        return [
+            [*log_key_prefix, obj.name[: -len(suffix)]]
+            for obj in directory.iterdir()
+            if obj.is_dir() and obj.name.endswith(suffix)
+        ]
+
+    def on_subscribe(self, subscription):
+        self._subscription_manager.add_subscription(subscription)
+
+    def on_unsubscribe(self, subscription):
+        self._subscription_manager.remove_subscription(subscription)
+
+    def dispose(self):
+        self._evict_downloads(float("inf"))
+        self._subscription_manager.dispose()
+        self._local_manager.dispose()
@@ -2,6 +2,9 @@
 """
 Delete Dagster runs (and their associated event logs) older than a retention window.
 
+With --sweep-orphans, instead reclaim compute log directories whose run record no longer
+exists (e.g. runs deleted before their logs were removed).
+
 WARNING:
 - This is destructive: it removes Dagster's record that the run ever occurred.
 - This can impact partitioned jobs/assets history.
@@ -12,9 +15,12 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import re
 import shutil
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, Optional
 
 from dagster import DagsterInstance, DagsterRunStatus, RunsFilter
@@ -26,6 +32,9 @@ TERMINAL_STATUSES = [
     DagsterRunStatus.CANCELED,
 ]
 
+# Compute log dirs are named after the run id; anything else under a log root is left alone.
+RUN_ID_DIR = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
 
 def iter_old_run_ids(
     instance: DagsterInstance,
@@ -48,6 +57,90 @@ def iter_old_run_ids(
             yield r.dagster_run.run_id
 
 
+def compute_log_roots(instance: DagsterInstance) -> list[str]:
+    """
+    Directories that hold one directory per run: local artifact storage (where
+    LocalComputeLogManager writes by default) plus any dirs the compute log manager reports
+    (anduin_compute_logs.CompressedComputeLogManager.base_dirs).
+    """
+    roots = [instance.storage_directory()]
+    roots.extend(getattr(instance.compute_log_manager, "base_dirs", []))
+    return list(dict.fromkeys(os.path.abspath(root) for root in roots if os.path.isdir(root)))
+
+
+def scan_run_dirs(root: str, min_mtime: float) -> list[tuple[str, str]]:
+    """
+    Return (run_id, path) for each run log directory in root last modified before min_mtime.
+    """
+    found = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if not RUN_ID_DIR.match(entry.name) or not entry.is_dir(follow_symlinks=False):
+                continue
+            if entry.stat(follow_symlinks=False).st_mtime < min_mtime:
+                found.append((entry.name, entry.path))
+    return found
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def remove_dir(path: str) -> int:
+    size = dir_size(path)
+    shutil.rmtree(path, ignore_errors=True)
+    return size
+
+
+def sweep_orphans(
+    instance: DagsterInstance,
+    min_age: dt.timedelta,
+    batch_size: int,
+    workers: int,
+    dry_run: bool,
+) -> int:
+    """
+    Remove compute log directories whose run record no longer exists.
+    """
+    roots = compute_log_roots(instance)
+    min_mtime = time.time() - min_age.total_seconds()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        candidates = [
+            item
+            for found in pool.map(lambda root: scan_run_dirs(root, min_mtime), roots)
+            for item in found
+        ]
+
+        # Look up run ids in batches rather than one query per directory.
+        run_ids = sorted({run_id for run_id, _ in candidates})
+        existing = set()
+        for i in range(0, len(run_ids), batch_size):
+            batch = run_ids[i : i + batch_size]
+            records = instance.get_run_records(filters=RunsFilter(run_ids=batch))
+            existing.update(r.dagster_run.run_id for r in records)
+
+        orphans = [path for run_id, path in candidates if run_id not in existing]
+        print(f"Scanned {len(roots)} log roots: {len(candidates)} run dirs, {len(orphans)} orphaned")
+
+        if dry_run:
+            for path in orphans:
+                print(f"[DRY RUN] Would remove {path}")
+            return 0
+
+        reclaimed = sum(pool.map(remove_dir, orphans))
+
+    print(f"Done. Removed {len(orphans)} orphaned log dirs, reclaimed {reclaimed / 1024 ** 2:.1f} MiB.")
+    return 0
+
+
 def main() -> int:
     p = argparse.ArgumentParser(description="Prune Dagster runs older than a retention window.")
     p.add_argument("--weeks", type=int, default=8, help="Retention window in weeks (default: 8)")
@@ -67,6 +160,23 @@ def main() -> int:
         action="store_true",
         help="Skip the interactive confirmation prompt.",
     )
+    p.add_argument(
+        "--sweep-orphans",
+        action="store_true",
+        help="Instead of pruning runs, remove compute log dirs whose run record no longer exists.",
+    )
+    p.add_argument(
+        "--min-age-hours",
+        type=float,
+        default=24,
+        help="With --sweep-orphans, skip log dirs modified more recently than this (default: 24)",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="With --sweep-orphans, parallel scan/delete workers (default: 8)",
+    )
     args = p.parse_args()
 
     # Use naive UTC to avoid tz-mismatch surprises; Dagster stores timestamps in DB and comparisons
@@ -76,6 +186,21 @@ def main() -> int:
 
     instance = DagsterInstance.get()
 
+    if args.sweep_orphans:
+        if not args.yes and not args.dry_run:
+            print("This will DELETE compute log dirs that have no matching Dagster run record.")
+            print("Type DELETE to continue:")
+            if sys.stdin.readline().strip() != "DELETE":
+                print("Aborted.")
+                return 1
+        return sweep_orphans(
+            instance,
+            min_age=dt.timedelta(hours=args.min_age_hours),
+            batch_size=args.batch_size,
+            workers=args.workers,
+            dry_run=args.dry_run,
+        )
+
     statuses = None if args.include_nonterminal else TERMINAL_STATUSES
 
     if not args.yes:
@@ -95,10 +220,12 @@ def main() -> int:
         # Removes the run record and event logs from Postgres storage.
         instance.delete_run(run_id)
 
-        # delete_run() does not clean up the local compute log directory; remove it explicitly.
-        compute_log_dir = os.path.join(instance.dagster_home, "storage", run_id)
-        if os.path.isdir(compute_log_dir):
-            shutil.rmtree(compute_log_dir)
+        # delete_run() does not clean up compute logs or run-scoped local artifacts; remove them
+        # explicitly.
+        instance.compute_log_manager.delete_logs(prefix=[run_id])
+        run_storage_dir = os.path.join(instance.storage_directory(), run_id)
+        if os.path.isdir(run_storage_dir):
+            shutil.rmtree(run_storage_dir)
 
         deleted += 1
 
@@ -7,6 +7,7 @@ import hashlib
 import json
 import dagster as dg
 import time
+from anduin_backfill import backfill_sensors, build_backfill_run_requests
 
 
 DATA_DIR = '/opt/data'
@@ -20,6 +21,7 @@ conn = psycopg2.connect(
 )
 
 users_partitions = dg.DynamicPartitionsDefinition(name="users")
+USERS_BACKFILL_CHUNK_SIZE = int(os.environ.get('USERS_BACKFILL_CHUNK_SIZE', 100))
 
 # condition = dg.AutomationCondition.eager().replace(
 #     "newly_updated", dg.AutomationCondition.data_version_changed()
@@ -44,48 +46,55 @@ users_partitions = dg.DynamicPartitionsDefinition(name="users")
   code_version="1.1"
 )
 def get_users_partition(context) -> dg.MaterializeResult:
-    user_id = context.partition_key
-
+    # Runs are launched over partition ranges by the backfill sensor, so handle every key
+    user_names = {}
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE cas_id = %s", (user_id,))
-    user = cursor.fetchone()
-
-    context.log.info(f"User: {user}")
-    user_data = {
-        "id": str(user[0]),
-        "cas_id": user[1],
-        "name": user[2]
-    }
-    user_json = json.dumps(user_data)
-    with open(os.path.join(DATA_DIR, f"user_{user_id}.json"), 'w') as f:
-        f.write(user_json)
-        context.log.info(f"User {user_id} data written to file")
-
-    return dg.MaterializeResult(metadata={"id": user[2]}, data_version=dg.DataVersion(user[2]))
+    for user_id in context.partition_keys:
+        cursor.execute("SELECT * FROM users WHERE cas_id = %s", (user_id,))
+        user = cursor.fetchone()
+
+        context.log.info(f"User: {user}")
+        user_data = {
+            "id": str(user[0]),
+            "cas_id": user[1],
+            "name": user[2]
+        }
+        user_json = json.dumps(user_data)
+        with open(os.path.join(DATA_DIR, f"user_{user_id}.json"), 'w') as f:
+            f.write(user_json)
+            context.log.info(f"User {user_id} data written to file")
+        user_names[user_id] = user[2]
+
+    if len(user_names) == 1:
+        name = next(iter(user_names.values()))
+        return dg.MaterializeResult(metadata={"id": name}, data_version=dg.DataVersion(name))
+    return dg.MaterializeResult(metadata={"count": len(user_names)})
 
 @dg.asset(
     partitions_def=users_partitions,
     code_version="1.1"
 )
 def update_users_partition(context: AssetExecutionContext, get_users_partition) -> dg.MaterializeResult:
-    user_id = context.partition_key
-
     upstream_result = get_users_partition
-    context.log.info(f"Upstream metadata for user {user_id}")
+    context.log.info(f"Upstream metadata for users {context.partition_keys}")
     context.log.info(upstream_result)
 
-    with open(os.path.join(DATA_DIR, f"user_{user_id}.json"), 'r') as f:
-        user_data = json.load(f)
-        context.log.info(f"Updating user {user_id} with data: {user_data}")
-        user_data['new_value'] = True
-        with open(os.path.join(DATA_DIR, f"user_{user_id}_updated.json"), 'w') as f:
-            json.dump(user_data, f)
-            context.log.info(f"User {user_id} updated and saved to disk")
-            response_hash = hashlib.sha256(json.dumps(user_data).encode()).hexdigest()
+    response_hash = None
+    for user_id in context.partition_keys:
+        with open(os.path.join(DATA_DIR, f"user_{user_id}.json"), 'r') as f:
+            user_data = json.load(f)
+            context.log.info(f"Updating user {user_id} with data: {user_data}")
+            user_data['new_value'] = True
+            with open(os.path.join(DATA_DIR, f"user_{user_id}_updated.json"), 'w') as f:
+                json.dump(user_data, f)
+                context.log.info(f"User {user_id} updated and saved to disk")
+                response_hash = hashlib.sha256(json.dumps(user_data).encode()).hexdigest()
 
     time.sleep(5)
 
-    return dg.MaterializeResult(data_version=dg.DataVersion(response_hash))
+    if len(context.partition_keys) == 1:
+        return dg.MaterializeResult(data_version=dg.DataVersion(response_hash))
+    return dg.MaterializeResult()
 
 # Create a job that materializes both assets in the correct order
 update_users_dynamic_job = dg.define_asset_job(
@@ -105,14 +114,22 @@ def all_regions_sensor(context: dg.SensorEvaluationContext):
 
     user_ids = [user[0] for user in users]
 
+    # One tracked backfill of chunked range runs instead of one queued run per user
+    _, run_requests, dynamic_partitions_requests = build_backfill_run_requests(
+        context,
+        users_partitions,
+        user_ids,
+        chunk_size=USERS_BACKFILL_CHUNK_SIZE,
+    )
+
     return dg.SensorResult(
-        run_requests=[dg.RunRequest(partition_key=user) for user in user_ids],
-        dynamic_partitions_requests=[users_partitions.build_add_request(user_ids)],
+        run_requests=run_requests,
+        dynamic_partitions_requests=dynamic_partitions_requests,
     )
 
 
 defs = dg.Definitions(
     jobs=[update_users_dynamic_job],
     assets=[get_users_partition, update_users_partition],
-    sensors=[all_regions_sensor]
+    sensors=[all_regions_sensor, *backfill_sensors]
 )
\ No newline at end of file